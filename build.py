@@ -1,17 +1,35 @@
 #!/usr/bin/env python3
 """
 统一构建脚本 - 一键生成静态网站
-用法: python3 build.py [--serve] [--clean]
+用法: python3 build.py [--serve] [--clean] [--daemon | --rebuild]
 """
 import os
 import re
 import sys
+import gzip
 import json
+import hashlib
+import time
 import shutil
+import socket
+import filecmp
 import argparse
+import threading
 import subprocess
+import socketserver
+from io import StringIO
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import partial, lru_cache
+from collections import ChainMap, OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager, redirect_stdout
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from email.utils import formatdate, parsedate_to_datetime
+from html import escape as html_escape, unescape as html_unescape
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+from xml.sax.saxutils import escape as xml_escape
 
 # 项目根目录
 ROOT_DIR = Path(__file__).parent.absolute()
@@ -19,6 +37,12 @@ DIST_DIR = ROOT_DIR / 'dist'
 POSTS_DIR = ROOT_DIR / 'posts'
 TEMPLATES_DIR = ROOT_DIR / 'templates'
 CONFIG_FILE = ROOT_DIR / 'config.json'
+# 本地缓存（GitHub 数据快照、部署清单），不纳入版本控制
+CACHE_DIR = ROOT_DIR / '.cache'
+# 构建暂存目录，成功后整体替换 dist/（需与 dist/ 位于同一文件系统）
+STAGING_DIR = ROOT_DIR / '.dist-staging'
+# 常驻构建进程监听的 Unix socket
+BUILD_SOCKET = ROOT_DIR / '.build.sock'
 
 # ============== 配置加载 ==============
 
@@ -29,6 +53,296 @@ def load_config():
             return json.load(f)
     return {}
 
+def parse_post_date(value):
+    """解析文章日期（如 2025-12-10 或 2025-12-10 08:30），无法解析时返回 None"""
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(str(value).strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+def get_build_time(posts_dir=None, templates_dir=None, config_file=CONFIG_FILE, posts=None):
+    """获取固定的构建时间，保证相同输入产生相同输出
+
+    优先使用 SOURCE_DATE_EPOCH 环境变量，否则取源文件（文章、模板、配置）的最新修改时间。
+    - config_file 为 None 时不计入配置文件（配置由调用方直接提供）
+    - 提供 posts（内存中的文章）时不扫描文章目录，改为计入其中最新的发布日期
+    """
+    epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if epoch:
+        return datetime.fromtimestamp(int(epoch))
+    templates_dir = Path(templates_dir or TEMPLATES_DIR)
+    sources = list(templates_dir.glob('*'))
+    if config_file is not None:
+        sources.append(Path(config_file))
+    if posts is None:
+        sources.extend(Path(posts_dir or POSTS_DIR).rglob('*.md'))
+    times = [f.stat().st_mtime for f in sources if f.is_file()]
+    for post in posts or ():
+        date = parse_post_date(post.date if isinstance(post, Post) else post.get('date', ''))
+        if date is not None:
+            times.append(date.timestamp())
+    return datetime.fromtimestamp(int(max(times))) if times else datetime(1970, 1, 1)
+
+# ============== 输出写入 ==============
+
+class OutputWriter:
+    """后台批量写出构建产物
+
+    渲染循环调用 write() 把 (路径, 内容) 放入有界队列，由线程池负责写盘，
+    磁盘 I/O 与 Markdown 转换重叠进行：
+    - 先写临时文件再 rename，保证每个文件原子替换
+    - 内容未变化的文件直接跳过，保持 mtime 稳定
+    - 指定 previous（上次的输出目录）时，内容相同的文件从那里硬链接过来，不重新写入
+    - 指定 known（相对路径 -> 内容哈希，跨构建保留）时按哈希判断未变化，不必读取旧文件
+    """
+
+    def __init__(self, root, workers=4, max_pending=64, verbose=False, previous=None, known=None):
+        self.root = Path(root)
+        self.previous = Path(previous) if previous else None
+        self.known = known
+        self.verbose = verbose
+        self.written = 0
+        self.skipped = 0
+        self.errors = []
+        self._lock = threading.Lock()
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='writer')
+        self._closed = False
+        self._inflight = 0
+        self._idle = threading.Condition(self._lock)
+        # 本次构建产生的文件
+        self.paths = set()
+
+    def write(self, rel_path, data):
+        """提交一个文件，队列已满时阻塞等待"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        rel_path = str(rel_path)
+        self._pending.acquire()
+        with self._lock:
+            self._inflight += 1
+            self.paths.add(rel_path)
+        try:
+            self._executor.submit(self._write, rel_path, data)
+        except Exception:
+            self._done()
+            raise
+
+    def _done(self):
+        with self._lock:
+            self._inflight -= 1
+            if not self._inflight:
+                self._idle.notify_all()
+        self._pending.release()
+
+    def _write(self, rel_path, data):
+        try:
+            target = self.root / rel_path
+            digest = content_hash(data) if self.known is not None else None
+            if digest is not None and self.known.get(rel_path) == digest and target.exists():
+                unchanged = True
+            else:
+                unchanged = self._unchanged(target, data)
+            if unchanged:
+                with self._lock:
+                    self.skipped += 1
+                    if digest is not None:
+                        self.known[rel_path] = digest
+                if self.verbose:
+                    print(f"   跳过 {rel_path} (未变化)")
+                return
+
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_name(f'.{target.name}.{os.getpid()}-{threading.get_ident()}.tmp')
+            if self.previous is not None:
+                previous = self.previous / rel_path
+                if self._unchanged(previous, data) and self._link(previous, tmp, target):
+                    with self._lock:
+                        self.skipped += 1
+                        if digest is not None:
+                            self.known[rel_path] = digest
+                    if self.verbose:
+                        print(f"   复用 {rel_path} (未变化)")
+                    return
+            try:
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, target)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+            with self._lock:
+                self.written += 1
+                if digest is not None:
+                    self.known[rel_path] = digest
+            if self.verbose:
+                print(f"   生成 {rel_path}")
+        except Exception as e:
+            with self._lock:
+                self.errors.append((rel_path, e))
+        finally:
+            self._done()
+
+    @staticmethod
+    def _link(source, tmp, target):
+        """把 source 硬链接（不支持时复制）到 target，失败返回 False"""
+        try:
+            try:
+                os.link(source, tmp)
+            except OSError:
+                shutil.copy2(source, tmp)
+            os.replace(tmp, target)
+            return True
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            return False
+
+    @staticmethod
+    def _unchanged(target, data):
+        try:
+            if target.stat().st_size != len(data):
+                return False
+            with open(target, 'rb') as f:
+                return f.read() == data
+        except OSError:
+            return False
+
+    @contextmanager
+    def write_stream(self, rel_path):
+        """逐段写出一个大文件（站点地图、订阅等），返回文本文件对象，内容不在内存中拼接
+
+        在调用线程中直接写临时文件，结束时与已有文件比较，相同则保留旧文件
+        """
+        rel_path = str(rel_path)
+        target = self.root / rel_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f'.{target.name}.{os.getpid()}-{threading.get_ident()}.tmp')
+        try:
+            with open(tmp, 'w', encoding='utf-8', newline='') as f:
+                yield f
+            digest = file_hash(tmp)
+            if self.known is not None and self.known.get(rel_path) == digest and target.exists():
+                unchanged = True
+            else:
+                unchanged = target.exists() and filecmp.cmp(tmp, target, shallow=False)
+            previous = self.previous / rel_path if self.previous is not None else None
+            if unchanged:
+                tmp.unlink()
+            elif previous is not None and previous.exists() and filecmp.cmp(tmp, previous, shallow=False):
+                tmp.unlink()
+                unchanged = self._link(previous, tmp, target)
+            if not unchanged and tmp.exists():
+                os.replace(tmp, target)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        with self._lock:
+            self.paths.add(rel_path)
+            if unchanged:
+                self.skipped += 1
+            else:
+                self.written += 1
+            if self.known is not None:
+                self.known[rel_path] = digest
+        if self.verbose:
+            print(f"   {'跳过' if unchanged else '生成'} {rel_path}")
+
+    def keep(self, rel_path):
+        """沿用输出目录中已有的文件（调用方确认内容未变），无法确认时返回 False"""
+        rel_path = str(rel_path)
+        if self.known is None or rel_path not in self.known or not (self.root / rel_path).exists():
+            return False
+        with self._lock:
+            self.paths.add(rel_path)
+            self.skipped += 1
+        return True
+
+    def flush(self):
+        """等待已提交的文件全部写完"""
+        with self._idle:
+            while self._inflight:
+                self._idle.wait()
+
+    def hash_files(self):
+        """输出目录中所有文件的内容哈希（有 known 时直接取本次构建文件的已知哈希）"""
+        if self.known is not None:
+            with self._lock:
+                return {p: self.known[p] for p in sorted(self.paths) if p in self.known}
+        return hash_output_files(self.root)
+
+    def pages(self):
+        """本次构建产生的文件（相对路径 -> 绝对路径）"""
+        return {rel_path: self.root / rel_path for rel_path in sorted(self.paths)}
+
+    def close(self):
+        """等待所有写入完成，有失败时抛出第一个错误（可重复调用）"""
+        if self._closed:
+            return
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        print(f"   写出 {self.written} 个文件，{self.skipped} 个未变化已跳过")
+        if self.errors:
+            rel_path, error = self.errors[0]
+            raise OSError(f"写入 {rel_path} 失败 (共 {len(self.errors)} 个错误): {error}")
+
+class MemoryOutput:
+    """内存输出：生成的文件写入一个 dict（相对路径 -> bytes），接口与 OutputWriter 相同
+
+    用于测试或嵌入其它工具，不触碰磁盘。
+    """
+
+    def __init__(self, files=None, verbose=False):
+        self.files = {} if files is None else files
+        self.verbose = verbose
+        self.written = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def write(self, rel_path, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        rel_path = str(rel_path)
+        with self._lock:
+            if self.files.get(rel_path) == data:
+                self.skipped += 1
+                return
+            self.files[rel_path] = data
+            self.written += 1
+        if self.verbose:
+            print(f"   生成 {rel_path}")
+
+    @contextmanager
+    def write_stream(self, rel_path):
+        buffer = StringIO()
+        yield buffer
+        self.write(rel_path, buffer.getvalue())
+
+    def keep(self, rel_path):
+        with self._lock:
+            if str(rel_path) not in self.files:
+                return False
+            self.skipped += 1
+        return True
+
+    def flush(self):
+        pass
+
+    def hash_files(self):
+        return {rel_path: content_hash(self.files[rel_path]) for rel_path in sorted(self.files)}
+
+    @property
+    def paths(self):
+        """本次构建产生的文件（与 OutputWriter.paths 对应）"""
+        return self.files.keys()
+
+    def pages(self):
+        return self.files
+
+    def close(self):
+        pass
+
 # ============== Markdown 解析 ==============
 
 def parse_frontmatter(content):
@@ -49,25 +363,106 @@ def parse_frontmatter(content):
             return meta, parts[2].strip()
     return meta, content
 
-def markdown_to_html(md):
-    """将 Markdown 转换为 HTML，支持数学公式"""
-    # 先保护数学公式，避免被其他处理破坏
+def slugify(text):
+    """生成标题锚点 ID（保留中文等 Unicode 字符）"""
+    text = re.sub(r'<[^>]+>', '', text)
+    text = re.sub(r'&[#\w]+;', '', text)
+    text = re.sub(r'[^\w\s-]', '', text.strip().lower())
+    return re.sub(r'[\s_-]+', '-', text).strip('-')
+
+def build_toc(headings):
+    """将扁平的标题列表转换为嵌套目录树"""
+    root = {'level': 0, 'children': []}
+    stack = [root]
+    for heading in headings:
+        node = dict(heading, children=[])
+        while len(stack) > 1 and stack[-1]['level'] >= node['level']:
+            stack.pop()
+        stack[-1]['children'].append(node)
+        stack.append(node)
+    return root['children']
+
+def toc_label(node):
+    """目录项文字：纯文本转义输出，其中的行内公式输出为 <span class="math-inline">"""
+    text, parts, pos = node['text'], [], 0
+    for start, end, tex in node.get('math', ()):
+        parts.append(html_escape(text[pos:start], quote=False))
+        parts.append(f'<span class="math-inline">{html_escape(tex, quote=False)}</span>')
+        pos = end
+    parts.append(html_escape(text[pos:], quote=False))
+    return ''.join(parts)
+
+def render_toc(nodes):
+    """将目录树渲染为嵌套的 <li> 列表"""
+    parts = []
+    for node in nodes:
+        parts.append(f'<li class="level-{node["level"]}"><a href="#{node["id"]}">{toc_label(node)}</a>')
+        if node['children']:
+            parts.append(f'<ul>{render_toc(node["children"])}</ul>')
+        parts.append('</li>')
+    return ''.join(parts)
+
+# Emoji 支持 :emoji_name:
+EMOJI_MAP = {
+    ':smile:': '😊', ':tada:': '🎉', ':rocket:': '🚀', ':fire:': '🔥',
+    ':heart:': '❤️', ':star:': '⭐', ':check:': '✅', ':x:': '❌',
+    ':warning:': '⚠️', ':bulb:': '💡', ':book:': '📚', ':memo:': '📝',
+    ':computer:': '💻', ':coffee:': '☕', ':thumbsup:': '👍', ':thumbsdown:': '👎',
+    ':eyes:': '👀', ':thinking:': '🤔', ':sunglasses:': '😎', ':muscle:': '💪'
+}
+
+# 行内语法（按顺序替换）
+INLINE_RULES = [
+    # 图片 - 先处理，避免被链接匹配
+    (re.compile(r'!\[([^\]]*)\]\(([^)]+)\)'), r'<img src="\2" alt="\1" />'),
+    # 链接
+    (re.compile(r'\[([^\]]+)\]\(([^)]+)\)'), r'<a href="\2">\1</a>'),
+    # 粗体
+    (re.compile(r'\*\*(.+?)\*\*'), r'<strong>\1</strong>'),
+    (re.compile(r'__(.+?)__'), r'<strong>\1</strong>'),
+    # 斜体（注意不要匹配数学公式中的下标）
+    (re.compile(r'(?<![\\a-zA-Z])\*([^*]+?)\*(?![*])'), r'<em>\1</em>'),
+    # 行内代码
+    (re.compile(r'`([^`]+)`'), r'<code>\1</code>'),
+]
+
+# 可能包含行内语法的字符，不含这些字符的文本（如大多数表格单元格）原样返回
+INLINE_MARKUP = re.compile(r'[:\[*_`]')
+
+TABLE_SEPARATOR = re.compile(r'^:?-+:?$')
+
+def markdown_to_html(md, toc=None, chunk_rows=None, math=True):
+    """将 Markdown 转换为 HTML，支持数学公式
+
+    公式输出为 <div class="math-block"> / <span class="math-inline">，内容是转义后的 TeX 源码，
+    由页面在接近视口时排版。
+    如果传入 toc 列表，会把 h1-h4 标题依次追加进去：text 为纯文本（公式保留原始文本），
+    math 为其中行内公式的 (起, 止, TeX) 位置，由 render_toc 转义输出。
+    表格逐行转换输出；chunk_rows 为正数时，表格前 chunk_rows 行直接显示，
+    其余行每 chunk_rows 行放进一个 <template class="table-chunk">，由页面脚本逐块插入。
+    math=False 时不输出公式元素，$...$ 等原样保留（用于不加载 KaTeX 的页面，如首页 README）。
+    """
+    chunk_rows = max(0, chunk_rows or 0)
+
+    # 先保护数学公式，避免被其他处理破坏（保存 TeX 源码和原始文本）
     math_blocks = []
     math_inlines = []
 
-    # 保护行间公式 $$...$$
+    # 保护行间公式 $$...$$ 和 \[...\]
     def save_math_block(match):
-        math_blocks.append(match.group(1))
+        math_blocks.append((match.group(1), match.group(0)))
         return f'MATHBLOCK{len(math_blocks)-1}ENDBLOCK'
 
     md = re.sub(r'\$\$([\s\S]+?)\$\$', save_math_block, md)
+    md = re.sub(r'\\\[([\s\S]+?)\\\]', save_math_block, md)
 
-    # 保护行内公式 $...$（但不匹配 $$）
+    # 保护行内公式 $...$（但不匹配 $$）和 \(...\)
     def save_math_inline(match):
-        math_inlines.append(match.group(1))
+        math_inlines.append((match.group(1), match.group(0)))
         return f'MATHINLINE{len(math_inlines)-1}ENDINLINE'
 
     md = re.sub(r'(?<!\$)\$(?!\$)(.+?)(?<!\$)\$(?!\$)', save_math_inline, md)
+    md = re.sub(r'\\\((.+?)\\\)', save_math_inline, md)
 
     lines = md.split('\n')
     html = []
@@ -79,8 +474,52 @@ def markdown_to_html(md):
     in_math_block = False
     math_lines = []
     in_table = False
-    table_rows = []
+    table_open = False
+    table_header = None
     table_aligns = []
+    table_rows = 0
+    heading_ids = set()
+
+    def heading_anchor(text):
+        """生成唯一的标题 ID，重复时追加 -1, -2 ..."""
+        base = slugify(restore_inline_math(text)) or 'section'
+        anchor, n = base, 0
+        while anchor in heading_ids:
+            n += 1
+            anchor = f'{base}-{n}'
+        heading_ids.add(anchor)
+        return anchor
+
+    def restore_inline_math(text):
+        return re.sub(r'MATHINLINE(\d+)ENDINLINE', lambda m: math_inlines[int(m.group(1))][1], text)
+
+    def restore_math_source(text):
+        """代码块中的"公式"恢复为原始文本"""
+        text = re.sub(r'MATHBLOCK(\d+)ENDBLOCK', lambda m: math_blocks[int(m.group(1))][1], text)
+        return restore_inline_math(text)
+
+    def restore_code_math(match):
+        """行内代码中的"公式"在构建时恢复为转义后的原始文本"""
+        code = re.sub(r'MATHBLOCK(\d+)ENDBLOCK',
+                      lambda m: html_escape(math_blocks[int(m.group(1))][1], quote=False), match.group(1))
+        code = re.sub(r'MATHINLINE(\d+)ENDINLINE',
+                      lambda m: html_escape(math_inlines[int(m.group(1))][1], quote=False), code)
+        return f'<code>{code}</code>'
+
+    def toc_entry(level, anchor, text):
+        """目录项：去掉标签得到纯文本，记录行内公式在其中的位置"""
+        pieces = re.split(r'MATH(BLOCK|INLINE)(\d+)END(?:BLOCK|INLINE)', re.sub(r'<[^>]+>', '', text))
+        plain, spans = html_unescape(pieces[0]), []
+        for i in range(1, len(pieces), 3):
+            if pieces[i] == 'BLOCK':
+                plain += math_blocks[int(pieces[i + 1])][1]
+            else:
+                tex, raw = math_inlines[int(pieces[i + 1])]
+                if math:
+                    spans.append((len(plain), len(plain) + len(raw), tex))
+                plain += raw
+            plain += html_unescape(pieces[i + 2])
+        return {'level': level, 'id': anchor, 'text': plain, 'math': spans}
 
     def close_list():
         nonlocal in_list, list_type
@@ -89,54 +528,63 @@ def markdown_to_html(md):
             in_list = False
             list_type = None
 
+    def emit_row(cells, tag):
+        row = ['<tr>']
+        for j, cell in enumerate(cells):
+            align = table_aligns[j] if j < len(table_aligns) else ''
+            align_attr = f' style="text-align:{align}"' if align else ''
+            row.append(f'<{tag}{align_attr}>{process_inline(cell)}</{tag}>')
+        row.append('</tr>')
+        html.append(''.join(row))
+
+    def open_table():
+        nonlocal table_open, table_header
+        html.append('<div class="table-wrapper"><table><thead>')
+        emit_row(table_header, 'th')
+        html.append('</thead><tbody>')
+        table_header = None
+        table_open = True
+
+    def add_table_row(cells):
+        """第一行作为表头（等分隔行确定对齐方式后输出），之后的行立即输出"""
+        nonlocal table_header, table_rows
+        if not table_open and table_header is None:
+            table_header = cells
+            return
+        if not table_open:
+            open_table()
+        if chunk_rows and table_rows >= chunk_rows and table_rows % chunk_rows == 0:
+            if table_rows > chunk_rows:
+                html.append('</template>')
+            html.append('<template class="table-chunk">')
+        emit_row(cells, 'td')
+        table_rows += 1
+
     def close_table():
-        nonlocal in_table, table_rows, table_aligns
-        if in_table and table_rows:
-            table_html = ['<div class="table-wrapper"><table>']
-            for i, row in enumerate(table_rows):
-                if i == 0:
-                    table_html.append('<thead><tr>')
-                    for j, cell in enumerate(row):
-                        align = table_aligns[j] if j < len(table_aligns) else ''
-                        align_attr = f' style="text-align:{align}"' if align else ''
-                        table_html.append(f'<th{align_attr}>{process_inline(cell)}</th>')
-                    table_html.append('</tr></thead><tbody>')
-                else:
-                    table_html.append('<tr>')
-                    for j, cell in enumerate(row):
-                        align = table_aligns[j] if j < len(table_aligns) else ''
-                        align_attr = f' style="text-align:{align}"' if align else ''
-                        table_html.append(f'<td{align_attr}>{process_inline(cell)}</td>')
-                    table_html.append('</tr>')
-            table_html.append('</tbody></table></div>')
-            html.append(''.join(table_html))
-            table_rows = []
-            table_aligns = []
-            in_table = False
+        nonlocal in_table, table_open, table_header, table_aligns, table_rows
+        if in_table:
+            if table_header is not None:
+                open_table()
+            if table_open:
+                if chunk_rows and table_rows > chunk_rows:
+                    html.append('</template>')
+                html.append('</tbody></table></div>')
+        in_table = False
+        table_open = False
+        table_header = None
+        table_aligns = []
+        table_rows = 0
 
     def process_inline(text):
-        # Emoji 支持 :emoji_name:
-        emoji_map = {
-            ':smile:': '😊', ':tada:': '🎉', ':rocket:': '🚀', ':fire:': '🔥',
-            ':heart:': '❤️', ':star:': '⭐', ':check:': '✅', ':x:': '❌',
-            ':warning:': '⚠️', ':bulb:': '💡', ':book:': '📚', ':memo:': '📝',
-            ':computer:': '💻', ':coffee:': '☕', ':thumbsup:': '👍', ':thumbsdown:': '👎',
-            ':eyes:': '👀', ':thinking:': '🤔', ':sunglasses:': '😎', ':muscle:': '💪'
-        }
-        for emoji_code, emoji in emoji_map.items():
-            text = text.replace(emoji_code, emoji)
-
-        # 图片 - 先处理，避免被链接匹配
-        text = re.sub(r'!\[([^\]]*)\]\(([^)]+)\)', r'<img src="\2" alt="\1" />', text)
-        # 链接
-        text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', r'<a href="\2">\1</a>', text)
-        # 粗体
-        text = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', text)
-        text = re.sub(r'__(.+?)__', r'<strong>\1</strong>', text)
-        # 斜体（注意不要匹配数学公式中的下标）
-        text = re.sub(r'(?<![\\a-zA-Z])\*([^*]+?)\*(?![*])', r'<em>\1</em>', text)
-        # 行内代码
-        text = re.sub(r'`([^`]+)`', r'<code>\1</code>', text)
+        if not INLINE_MARKUP.search(text):
+            return text
+        if ':' in text:
+            for emoji_code, emoji in EMOJI_MAP.items():
+                text = text.replace(emoji_code, emoji)
+        for pattern, replacement in INLINE_RULES:
+            text = pattern.sub(replacement, text)
+        if '<code>' in text and 'MATH' in text:
+            text = re.sub(r'<code>(.*?)</code>', restore_code_math, text)
         return text
 
     for line in lines:
@@ -154,7 +602,7 @@ def markdown_to_html(md):
             continue
 
         if in_code:
-            code_lines.append(line.replace('<', '&lt;').replace('>', '&gt;'))
+            code_lines.append(restore_math_source(line).replace('<', '&lt;').replace('>', '&gt;'))
             continue
 
         # 表格行检测
@@ -163,7 +611,7 @@ def markdown_to_html(md):
             cells = [c.strip() for c in line.strip()[1:-1].split('|')]
 
             # 检查是否是分隔行（如 |:---:|:---:|）
-            if all(re.match(r'^:?-+:?$', c.strip()) for c in cells if c.strip()):
+            if all(TABLE_SEPARATOR.match(c) for c in cells if c):
                 # 解析对齐方式
                 table_aligns = []
                 for c in cells:
@@ -176,7 +624,7 @@ def markdown_to_html(md):
                         table_aligns.append('left')
                 in_table = True
             else:
-                table_rows.append(cells)
+                add_table_row(cells)
                 in_table = True
             continue
         elif in_table:
@@ -193,7 +641,10 @@ def markdown_to_html(md):
             if match:
                 level = len(match.group(1))
                 text = process_inline(match.group(2))
-                html.append(f'<h{level}>{text}</h{level}>')
+                anchor = heading_anchor(text)
+                html.append(f'<h{level} id="{anchor}">{text}</h{level}>')
+                if toc is not None and level <= 4:
+                    toc.append(toc_entry(level, anchor, text))
                 continue
 
         if line.startswith('>'):
@@ -266,14 +717,16 @@ def markdown_to_html(md):
     close_table()
     result = '\n'.join(html)
 
-    # 恢复行间公式（块级）
-    for i, math in enumerate(math_blocks):
-        # 使用 div 标签包裹，KaTeX 会自动识别 $$...$$
-        result = result.replace(f'MATHBLOCK{i}ENDBLOCK', f'<div class="math-block">$${math}$$</div>')
+    if not math:
+        return restore_math_source(result)
 
-    # 恢复行内公式
-    for i, math in enumerate(math_inlines):
-        result = result.replace(f'MATHINLINE{i}ENDINLINE', f'${math}$')
+    # 恢复公式：一次扫描替换全部占位符，输出带 TeX 源码的标记元素
+    result = re.sub(r'MATHBLOCK(\d+)ENDBLOCK',
+                    lambda m: f'<div class="math-block">{html_escape(math_blocks[int(m.group(1))][0], quote=False)}</div>',
+                    result)
+    result = re.sub(r'MATHINLINE(\d+)ENDINLINE',
+                    lambda m: f'<span class="math-inline">{html_escape(math_inlines[int(m.group(1))][0], quote=False)}</span>',
+                    result)
 
     return result
 
@@ -283,8 +736,10 @@ def get_value(obj, path):
     """从嵌套对象中获取值"""
     value = obj
     for part in path.split('.'):
-        if isinstance(value, dict):
+        if isinstance(value, Mapping):
             value = value.get(part, '')
+        elif isinstance(value, Post):
+            value = getattr(value, part, '')
         elif isinstance(value, list) and part.isdigit():
             idx = int(part)
             value = value[idx] if idx < len(value) else ''
@@ -345,8 +800,8 @@ def render_template(template_content, **kwargs):
             # 渲染每个项
             output_parts = []
             for item in items:
-                item_context = context.copy()
-                item_context[var_name] = item
+                # 只叠加循环变量，不复制整个上下文
+                item_context = ChainMap({var_name: item}, context)
                 # 递归处理循环内容
                 rendered = process_for_loops(loop_content, item_context)
                 rendered = process_if_conditions(rendered, item_context)
@@ -407,6 +862,11 @@ def render_template(template_content, **kwargs):
             value = get_value(context, neq_match.group(1))
             return str(value) != neq_match.group(2)
 
+        # 处理 or
+        if ' or ' in condition:
+            parts = condition.split(' or ')
+            return any(evaluate_condition(p.strip(), context) for p in parts)
+
         # 处理 and
         if ' and ' in condition:
             parts = condition.split(' and ')
@@ -444,56 +904,157 @@ def render_template(template_content, **kwargs):
 
 # ============== 博客构建 ==============
 
-def get_posts():
-    """获取所有博客文章（支持文件夹结构）"""
+class Post:
+    """文章记录
+
+    使用 __slots__ 紧凑存储元数据；正文只在渲染时按需转换，
+    页面写出后调用 release() 释放，避免所有文章的 HTML 同时驻留内存。
+    """
+    __slots__ = ('slug', 'title', 'date', 'tags', 'summary', 'lang',
+                 'category', 'path', 'source', 'body', 'stamp', 'digest', 'html', 'toc_html')
+
+    def __init__(self, slug, title, date, tags, summary, lang, category, path, source=None, body=None,
+                 stamp=None, digest=None):
+        self.slug = slug
+        self.title = title
+        self.date = date
+        # 标签和分类重复率很高，驻留后所有文章共享同一个字符串对象
+        self.tags = [sys.intern(tag) for tag in tags]
+        self.summary = summary
+        self.lang = sys.intern(lang)
+        self.category = sys.intern(category)
+        self.path = path
+        # 正文来源：源文件路径，或直接提供的 Markdown 文本（内存中的文章）
+        self.source = source
+        self.body = body
+        # 源文件的 (mtime_ns, 大小)，判断正文是否变化
+        self.stamp = stamp
+        # 源文件内容哈希，用于站点地图和订阅的 lastmod
+        self.digest = digest
+        self.html = None
+        self.toc_html = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """从 dict 创建内存中的文章，正文放在 body 字段"""
+        slug = data['slug']
+        category = data.get('category', '')
+        return cls(
+            slug=slug,
+            title=data.get('title', '无标题'),
+            date=str(data.get('date', '')),
+            tags=data.get('tags', []),
+            summary=data.get('summary', ''),
+            lang=data.get('lang', 'en'),
+            category=category,
+            path=data.get('path') or (f"{category}/{slug}.md" if category else f"{slug}.md"),
+            body=data.get('body', ''),
+            digest=content_hash(data.get('body', '').encode('utf-8'))
+        )
+
+    def fingerprint(self):
+        """元数据和正文版本，相同则渲染出的页面相同"""
+        return (self.slug, self.title, self.date, tuple(self.tags), self.summary, self.lang,
+                self.category, self.path, self.stamp if self.body is None else self.body)
+
+    def to_dict(self):
+        """导出元数据（供 Flask 模板 tojson 使用）"""
+        return {
+            'slug': self.slug,
+            'title': self.title,
+            'date': self.date,
+            'tags': self.tags,
+            'summary': self.summary,
+            'lang': self.lang,
+            'category': self.category,
+            'path': self.path
+        }
+
+    def render(self, chunk_rows=None):
+        """读取正文并转换为 HTML 和目录（chunk_rows 见 markdown_to_html）"""
+        if self.body is not None:
+            body = self.body
+        else:
+            with open(self.source, 'r', encoding='utf-8') as f:
+                content = f.read()
+            _, body = parse_frontmatter(content)
+        headings = []
+        self.html = markdown_to_html(body, toc=headings, chunk_rows=chunk_rows)
+        self.toc_html = render_toc(build_toc(headings))
+
+    def release(self):
+        """释放已写出的正文"""
+        self.html = None
+        self.toc_html = None
+
+def get_posts(posts_dir=None, cache=None):
+    """获取所有博客文章（支持文件夹结构），只解析元数据
+
+    cache 为跨构建保留的 dict（源文件路径 -> Post），源文件未变化时直接复用，不再读取
+    """
+    posts_dir = Path(posts_dir or POSTS_DIR)
     posts = []
-    if not POSTS_DIR.exists():
+    if not posts_dir.exists():
         return posts
 
     # 递归获取所有 .md 文件
-    for filepath in POSTS_DIR.rglob('*.md'):
+    seen = set()
+    for filepath in sorted(posts_dir.rglob('*.md')):
+        st = filepath.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+        if cache is not None:
+            seen.add(filepath)
+            cached = cache.get(filepath)
+            if cached is not None and cached.stamp == stamp:
+                posts.append(cached)
+                continue
+
         with open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
-        meta, body = parse_frontmatter(content)
-        html = markdown_to_html(body)
+        meta, _ = parse_frontmatter(content)
 
         # 计算文章的分类（从文件路径提取）
-        rel_path = filepath.relative_to(POSTS_DIR)
+        rel_path = filepath.relative_to(posts_dir)
         category = str(rel_path.parent) if rel_path.parent != Path('.') else ''
 
-        posts.append({
-            'slug': filepath.stem,
-            'title': meta.get('title', '无标题'),
-            'date': meta.get('date', ''),
-            'tags': meta.get('tags', []),
-            'summary': meta.get('summary', ''),
-            'lang': meta.get('lang', 'en'),
-            'category': category,  # 新增：文章分类
-            'path': str(rel_path),  # 新增：文件路径
-            'html': html
-        })
-
-    posts.sort(key=lambda x: x['date'], reverse=True)
+        post = Post(
+            slug=filepath.stem,
+            title=meta.get('title', '无标题'),
+            date=meta.get('date', ''),
+            tags=meta.get('tags', []),
+            summary=meta.get('summary', ''),
+            lang=meta.get('lang', 'en'),
+            category=category,
+            path=str(rel_path),
+            source=filepath,
+            stamp=stamp,
+            digest=content_hash(content.encode('utf-8'))
+        )
+        posts.append(post)
+        if cache is not None:
+            cache[filepath] = post
+
+    if cache is not None:
+        # 移除已删除的文章
+        for filepath in set(cache) - seen:
+            del cache[filepath]
+
+    # 日期相同时按路径排序，保证输出顺序稳定
+    posts.sort(key=lambda x: (x.date, x.path), reverse=True)
 
     # Debug: print first post details
     if posts:
-        print(f"   示例文章: {posts[0]['title']} (category: '{posts[0].get('category', 'None')}')")
+        print(f"   示例文章: {posts[0].title} (category: '{posts[0].category}')")
 
     return posts
 
-def get_posts_tree():
-    """获取博客文章的树形结构"""
+def get_posts_tree(posts):
+    """获取博客文章的树形结构（复用已解析的文章元数据）"""
     tree = {}
-    if not POSTS_DIR.exists():
-        return tree
-
-    for filepath in POSTS_DIR.rglob('*.md'):
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        meta, body = parse_frontmatter(content)
 
+    for post in posts:
         # 计算相对路径
-        rel_path = filepath.relative_to(POSTS_DIR)
+        rel_path = Path(post.path)
         parts = list(rel_path.parts)
 
         # 构建树形结构
@@ -511,20 +1072,20 @@ def get_posts_tree():
             if parts[-2] not in parent:
                 parent[parts[-2]] = {'_folders': {}, '_files': []}
             parent[parts[-2]]['_files'].append({
-                'name': filepath.stem,
-                'title': meta.get('title', '无标题'),
-                'date': meta.get('date', ''),
-                'path': str(rel_path)
+                'name': post.slug,
+                'title': post.title,
+                'date': post.date,
+                'path': post.path
             })
         else:
             # 根目录文件
             if '_root' not in tree:
                 tree['_root'] = {'_folders': {}, '_files': []}
             tree['_root']['_files'].append({
-                'name': filepath.stem,
-                'title': meta.get('title', '无标题'),
-                'date': meta.get('date', ''),
-                'path': str(rel_path)
+                'name': post.slug,
+                'title': post.title,
+                'date': post.date,
+                'path': post.path
             })
 
     return tree
@@ -532,14 +1093,14 @@ def get_posts_tree():
 def get_related_posts(current_post, all_posts, limit=3):
     """获取相关文章（基于标签相似度）"""
     related = []
-    current_tags = set(current_post['tags'])
+    current_tags = set(current_post.tags)
 
     for post in all_posts:
-        if post['slug'] == current_post['slug']:
+        if post.slug == current_post.slug:
             continue
 
         # 计算标签重叠数量
-        post_tags = set(post['tags'])
+        post_tags = set(post.tags)
         common_tags = current_tags & post_tags
         similarity = len(common_tags)
 
@@ -553,19 +1114,55 @@ def get_related_posts(current_post, all_posts, limit=3):
     related.sort(key=lambda x: x['similarity'], reverse=True)
     return [item['post'] for item in related[:limit]]
 
-def build_blog():
-    """构建博客页面"""
+def get_adjacent_posts(post_list, index):
+    """列表（按日期倒序）中相邻的文章，返回 (上一篇, 下一篇)，即更早和更新的一篇"""
+    older = post_list[index + 1] if index + 1 < len(post_list) else None
+    newer = post_list[index - 1] if index > 0 else None
+    return older, newer
+
+def pick_prefetch_posts(current_post, candidates, budget):
+    """按候选顺序去重，取前 budget 篇作为预取目标"""
+    picked = []
+    seen = {current_post.slug}
+    for post in candidates:
+        if len(picked) >= budget:
+            break
+        if post is not None and post.slug not in seen:
+            seen.add(post.slug)
+            picked.append(post)
+    return picked
+
+def speculation_rules(urls):
+    """生成 Speculation Rules 预取提示（JSON），没有 URL 时返回空字符串"""
+    if not urls:
+        return ''
+    rules = {'prefetch': [{'source': 'list', 'urls': urls}]}
+    return json.dumps(rules, ensure_ascii=False).replace('</', '<\\/')
+
+def build_blog(writer=None, posts=None, config=None, templates_dir=None, page_keys=None,
+               cache_dir=None, build_time=None):
+    """构建博客页面（posts 为已解析的文章列表，未提供时自动扫描）
+
+    page_keys 为跨构建保留的 dict（页面路径 -> 渲染输入），输入未变化的文章页面不再重新渲染。
+    同时生成站点地图和 Atom 订阅，cache_dir 中保存各文章的 lastmod 索引。
+    """
     print("📝 构建博客...")
-
-    config = load_config()
-    posts = get_posts()
-    posts_tree = get_posts_tree()
+    own_writer = writer is None
+    if own_writer:
+        writer = OutputWriter(DIST_DIR)
+
+    if config is None:
+        config = load_config()
+    templates_dir = Path(templates_dir or TEMPLATES_DIR)
+    if posts is None:
+        posts = get_posts()
+    posts_tree = get_posts_tree(posts)
     print(f"   找到 {len(posts)} 篇文章")
 
     # 按分类分组文章
     posts_by_category = {}
     for post in posts:
-        category = post.get('category', '') or 'Uncategorized'
+        category = post.category or 'Uncategorized'
         if category not in posts_by_category:
             posts_by_category[category] = []
         posts_by_category[category].append(post)
@@ -584,83 +1181,154 @@ def build_blog():
             'count': len(cat_posts)
         })
 
-    # 创建 post 目录
-    post_dir = DIST_DIR / 'post'
-    post_dir.mkdir(exist_ok=True)
-
     # 读取模板
-    blog_template = TEMPLATES_DIR / 'blog.html'
-    post_template = TEMPLATES_DIR / 'post.html'
+    blog_template = templates_dir / 'blog.html'
+    post_template = templates_dir / 'post.html'
+
+    # 每个页面最多预取的文章数
+    prefetch_budget = max(0, int(config.get('prefetch_budget', 3)))
 
-    # 生成博客列表页
+    # 生成博客列表页（预取列表最前面的几篇文章）
     if blog_template.exists():
         with open(blog_template, 'r', encoding='utf-8') as f:
             template = f.read()
-        html = render_template(template, config=config, posts=posts, posts_tree=posts_tree, categories=categories_list)
-        with open(DIST_DIR / 'blog.html', 'w', encoding='utf-8') as f:
-            f.write(html)
-        print("   生成 blog.html")
+        shown = [post for category in categories_list for post in category['posts']]
+        prefetch = [f"post/{post.slug}.html" for post in shown[:prefetch_budget]]
+        html = render_template(template, config=config, posts=posts, posts_tree=posts_tree, categories=categories_list,
+                               speculation_rules=speculation_rules(prefetch))
+        writer.write('blog.html', html)
+
+    # 同一分类内和全站按日期的相邻文章
+    category_positions = {}
+    for cat_posts in posts_by_category.values():
+        for index, post in enumerate(cat_posts):
+            category_positions[post.slug] = (cat_posts, index)
 
     # 生成文章页面
+    html_chars = 0
+    reused = 0
     if post_template.exists():
         with open(post_template, 'r', encoding='utf-8') as f:
             template = f.read()
-        for post in posts:
+        config_key = json.dumps(config, sort_keys=True) if page_keys is not None else None
+        # 超过该行数的表格分块输出，页面逐块插入
+        chunk_rows = max(0, int(config.get('table_chunk_rows', 200)))
+        for index, post in enumerate(posts):
             # 获取相关文章
             related_posts = get_related_posts(post, posts, limit=3)
-            html = render_template(template, config=config, post=post, related_posts=related_posts)
-            with open(post_dir / f"{post['slug']}.html", 'w', encoding='utf-8') as f:
-                f.write(html)
-            print(f"   生成 post/{post['slug']}.html")
+            prev_post, next_post = get_adjacent_posts(*category_positions[post.slug])
+            older, newer = get_adjacent_posts(posts, index)
+            # 预取顺序：分类内的下一篇/上一篇，其次是相关文章，最后是全站按日期相邻的文章
+            prefetch_posts = pick_prefetch_posts(
+                post, [next_post, prev_post, *related_posts, newer, older], prefetch_budget)
+            rel_path = f"post/{post.slug}.html"
+            if page_keys is not None:
+                key = (template, config_key, post.fingerprint(),
+                       tuple(related.fingerprint() for related in related_posts),
+                       tuple(nav.fingerprint() if nav is not None else None for nav in (prev_post, next_post)),
+                       tuple(p.slug for p in prefetch_posts))
+                if page_keys.get(rel_path) == key and writer.keep(rel_path):
+                    reused += 1
+                    continue
+            post.render(chunk_rows)
+            html = render_template(template, config=config, post=post, related_posts=related_posts,
+                                   prev_post=prev_post, next_post=next_post,
+                                   speculation_rules=speculation_rules([f"{p.slug}.html" for p in prefetch_posts]))
+            writer.write(rel_path, html)
+            if page_keys is not None:
+                page_keys[rel_path] = key
+            html_chars += len(post.html)
+            # 页面已交给写出队列，释放正文
+            post.release()
+    if reused:
+        print(f"   {reused} 篇文章未变化，沿用已有页面")
+
+    # 站点地图和订阅
+    site_url = config.get('site_url', '').rstrip('/')
+    if site_url:
+        lastmod = update_lastmod_index(posts, build_time or get_build_time(), cache_dir)
+        write_sitemap(writer, posts, site_url, lastmod)
+        write_feeds(writer, posts_by_category, config, site_url, lastmod)
+    else:
+        print("   跳过站点地图和订阅: config.json 未设置 site_url")
 
+    if own_writer:
+        writer.close()
+    peak = peak_memory_mb()
+    if peak is not None:
+        print(f"   正文 HTML 共 {html_chars/1000/1000:.1f}M 字符，进程峰值内存 {peak:.1f}MB")
     print("   完成!")
     return posts
 
+def peak_memory_mb():
+    """返回进程峰值内存 (MB)，不支持的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
 # ============== 主页构建 ==============
 
-def build_homepage():
-    """构建主页 (简化版，使用预生成的模板)"""
+def build_homepage(writer=None, posts=None, github_info=None, config=None,
+                   templates_dir=None, assets_dir=None, build_time=None):
+    """构建主页 (简化版，使用预生成的模板)
+
+    posts / github_info 可由调用方预先准备，未提供时在这里获取
+    """
     print("🏠 构建主页...")
 
-    config = load_config()
-    posts = get_posts()
-    posts_tree = get_posts_tree()
+    if config is None:
+        config = load_config()
+    templates_dir = Path(templates_dir or TEMPLATES_DIR)
+    assets_dir = Path(assets_dir or ROOT_DIR)
+    if posts is None:
+        posts = get_posts()
+    posts_tree = get_posts_tree(posts)
 
     # 读取主页模板
-    index_template = TEMPLATES_DIR / 'index.html'
+    index_template = templates_dir / 'index.html'
     if not index_template.exists():
         print("   错误: templates/index.html 不存在")
         return False
 
     # 由于主页模板很复杂，需要 Flask 渲染，我们使用 Flask 测试客户端
     try:
-        # 动态创建一个简单的 Flask 应用
-        from flask import Flask, render_template
+        from flask import render_template
         import requests
 
-        app = Flask(__name__, template_folder=str(TEMPLATES_DIR))
+        app = get_flask_app(str(templates_dir))
 
         # 获取 GitHub 信息
-        github_info = get_github_info(config)
+        build_time = build_time or get_build_time()
+        if github_info is None:
+            github_info = get_github_info(config, cache_dir=CACHE_DIR)
+        # 页面上的年份随 GitHub 数据的获取时间走，未访问网络时取构建时间
+        now = github_info.get('fetched_at') or build_time
 
         with app.app_context():
             # 检查背景图片
             background_image = config.get('background', {}).get('image', 'background.jpg')
-            background_exists = (ROOT_DIR / background_image).exists()
+            background_exists = (assets_dir / background_image).exists()
 
             html = render_template('index.html',
                                    github_info=github_info,
                                    config=config,
-                                   now=datetime.now(),
+                                   now=now,
                                    background_exists=background_exists,
                                    background_path=background_image,
-                                   recent_posts=posts[:3],
+                                   recent_posts=[post.to_dict() for post in posts[:3]],
                                    posts_tree=posts_tree)
 
-        with open(DIST_DIR / 'index.html', 'w', encoding='utf-8') as f:
-            f.write(html)
+        if writer is None:
+            with open(DIST_DIR / 'index.html', 'w', encoding='utf-8') as f:
+                f.write(html)
+            print("   生成 index.html")
+        else:
+            writer.write('index.html', html)
 
-        print("   生成 index.html")
         print("   完成!")
         return True
 
@@ -668,16 +1336,42 @@ def build_homepage():
         print(f"   错误: {e}")
         return False
 
-def get_github_info(config):
-    """获取 GitHub 用户信息（优化版：减少请求，防止超时）"""
-    import requests
-    import ssl
-    ssl._create_default_https_context = ssl._create_unverified_context
-
-    github_url = config.get('github_url', '')
-    username = github_url.rstrip('/').split('/')[-1] if github_url else ''
+@lru_cache(maxsize=None)
+def get_flask_app(templates_dir):
+    """按模板目录缓存 Flask 应用，Jinja 编译好的模板随之复用（模板文件修改后自动重新加载）"""
+    from flask import Flask
+    app = Flask(__name__, template_folder=templates_dir)
+    app.jinja_env.auto_reload = True
+    return app
+
+# 主页模板用到的仓库字段，其余字段（如 updated_at）频繁变化但不影响页面
+REPO_FIELDS = ('name', 'html_url', 'description', 'language', 'stargazers_count', 'pushed_at')
+
+def load_github_snapshot(cache_dir=None):
+    """读取上次成功获取的 GitHub 数据快照，cache_dir 为 None 时没有快照"""
+    if cache_dir is None:
+        return {}
+    snapshot_file = Path(cache_dir) / 'github.json'
+    if snapshot_file.exists():
+        try:
+            with open(snapshot_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {}
 
-    default_info = {
+def save_github_snapshot(info, cache_dir=None):
+    """保存 GitHub 数据快照（键排序，内容不变时文件不变），cache_dir 为 None 时不保存"""
+    if cache_dir is None:
+        return
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(exist_ok=True)
+    with open(cache_dir / 'github.json', 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+def default_github_info(config):
+    """不访问网络时使用的 GitHub 信息（取自配置）"""
+    return {
         "avatar_url": config.get('avatar', "https://avatars.githubusercontent.com/u/1000000?v=4"),
         "name": config.get('name', 'User'),
         "bio": config.get('bio', ''),
@@ -690,9 +1384,31 @@ def get_github_info(config):
         "tech_stack": []
     }
 
+def get_github_info(config, now=None, cache_dir=None):
+    """获取 GitHub 用户信息（优化版：减少请求，防止超时）
+
+    某项数据获取失败时沿用上次的快照，避免网络波动导致主页内容来回变化。
+    活动统计以 now 为基准，默认为获取时间（设置了 SOURCE_DATE_EPOCH 时取该时间），
+    并记录在返回值的 fetched_at 中。
+    """
+    if now is None:
+        epoch = os.environ.get('SOURCE_DATE_EPOCH')
+        now = datetime.fromtimestamp(int(epoch)) if epoch else datetime.now()
+    import requests
+    import ssl
+    ssl._create_default_https_context = ssl._create_unverified_context
+
+    github_url = config.get('github_url', '')
+    username = github_url.rstrip('/').split('/')[-1] if github_url else ''
+
+    default_info = default_github_info(config)
+
     if not username:
         return default_info
 
+    # 记录本次成功刷新的字段
+    refreshed = set()
+
     try:
         print(f"   获取 GitHub 数据: {username}")
         headers = {'Accept': 'application/vnd.github.v3+json'}
@@ -709,6 +1425,7 @@ def get_github_info(config):
                 default_info['avatar_url'] = user.get('avatar_url', default_info['avatar_url'])
                 default_info['name'] = user.get('name') or username
                 default_info['bio'] = config.get('bio') or user.get('bio', '')
+                refreshed.update(['avatar_url', 'name', 'bio'])
         except Exception as e:
             print(f"   获取用户信息失败: {e}")
 
@@ -720,7 +1437,7 @@ def get_github_info(config):
                 repos = resp.json()
                 default_info['total_repos'] = len(repos)
                 default_info['total_stars'] = sum(r.get('stargazers_count', 0) for r in repos)
-                default_info['recent_repos'] = repos[:5]
+                default_info['recent_repos'] = [{k: r.get(k) for k in REPO_FIELDS} for r in repos[:5]]
 
                 # 分析技术栈
                 languages = {}
@@ -731,9 +1448,10 @@ def get_github_info(config):
 
                 colors = ['#6a11cb', '#2575fc', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6']
                 tech_stack = []
-                for i, (lang, _) in enumerate(sorted(languages.items(), key=lambda x: -x[1])[:6]):
+                for i, (lang, _) in enumerate(sorted(languages.items(), key=lambda x: (-x[1], x[0]))[:6]):
                     tech_stack.append({'name': lang, 'color': colors[i % len(colors)]})
                 default_info['tech_stack'] = tech_stack
+                refreshed.update(['total_repos', 'total_stars', 'recent_repos', 'tech_stack'])
         except Exception as e:
             print(f"   获取仓库信息失败: {e}")
 
@@ -747,14 +1465,15 @@ def get_github_info(config):
                     # 限制README大小，防止内存问题
                     if len(readme_text) > 50000:  # 限制50KB
                         readme_text = readme_text[:50000] + "\n\n...(内容过长，已截断)"
-                    default_info['readme_content'] = markdown_to_html(readme_text)
+                    default_info['readme_content'] = markdown_to_html(readme_text, math=False)
+                    refreshed.add('readme_content')
                     break
         except Exception as e:
             print(f"   获取README失败: {e}")
 
         # 获取活动数据（简化版，减少请求）
         try:
-            from datetime import datetime, timedelta
+            from datetime import timedelta
 
             # 只获取第一页事件
             resp = requests.get(f'https://api.github.com/users/{username}/events?per_page=100&page=1',
@@ -765,7 +1484,6 @@ def get_github_info(config):
 
                 if events:
                     # 按最近12个月统计
-                    now = datetime.now()
                     monthly_commits = [0] * 12
 
                     # 生成月份标签（使用英文简称，前端会处理国际化）
@@ -792,35 +1510,333 @@ def get_github_info(config):
                     if total_events > 0:
                         default_info['activity_data'] = monthly_commits
                         print(f"   获取到 {total_events} 次活动记录")
+                refreshed.add('activity_data')
         except Exception as e:
             print(f"   获取活动数据失败: {e}")
 
     except Exception as e:
         print(f"   GitHub API 错误: {e}")
 
+    # 未能刷新的字段沿用快照
+    snapshot = load_github_snapshot(cache_dir)
+    for key, value in snapshot.items():
+        if key not in refreshed and key in default_info:
+            default_info[key] = value
+    if refreshed:
+        save_github_snapshot(default_info, cache_dir)
+
+    default_info['fetched_at'] = now
     return default_info
 
+# ============== 站点地图和订阅 ==============
+
+# 单个站点地图文件的 URL 上限（sitemaps.org 协议规定）
+SITEMAP_LIMIT = 50000
+
+def w3c_datetime(value, default):
+    """把文章日期（如 2025-12-10 或 2025-12-10 08:30）转换为 UTC 的 W3C 时间格式"""
+    date = parse_post_date(value)
+    return date.strftime('%Y-%m-%dT%H:%M:%SZ') if date is not None else default
+
+def update_lastmod_index(posts, build_time, cache_dir=None):
+    """根据源文件内容哈希计算每篇文章的 lastmod（文章路径 -> W3C 时间）
+
+    索引保存在 cache_dir/lastmod.json：内容哈希未变时沿用记录的时间，变化时记为本次构建时间，
+    首次出现的文章取其发布日期。cache_dir 为 None 时不读写索引。
+    """
+    index = {}
+    index_file = Path(cache_dir) / 'lastmod.json' if cache_dir is not None else None
+    if index_file is not None and index_file.exists():
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+
+    now = datetime.fromtimestamp(build_time.timestamp(), timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    updated = {}
+    for post in posts:
+        record = index.get(post.path)
+        if record is not None and record.get('hash') == post.digest:
+            updated[post.path] = record
+        elif record is not None:
+            updated[post.path] = {'hash': post.digest, 'lastmod': now}
+        else:
+            updated[post.path] = {'hash': post.digest, 'lastmod': w3c_datetime(post.date, now)}
+
+    if index_file is not None and updated != index:
+        index_file.parent.mkdir(exist_ok=True)
+        with open(index_file, 'w', encoding='utf-8') as f:
+            json.dump(updated, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return {path: record['lastmod'] for path, record in updated.items()}
+
+def page_url(site_url, rel_path):
+    return f"{site_url}/{quote(rel_path)}"
+
+def xml_attr(value):
+    return xml_escape(value, {'"': '&quot;'})
+
+def write_sitemap(writer, posts, site_url, lastmod):
+    """逐条写出 sitemap.xml，URL 超过 SITEMAP_LIMIT 时拆分为多个文件并由 sitemap.xml 索引"""
+    newest = max(lastmod.values(), default=None)
+
+    def entries():
+        # 主页和列表页随文章更新
+        yield '', newest
+        yield 'blog.html', newest
+        for post in posts:
+            yield f"post/{post.slug}.html", lastmod[post.path]
+
+    def write_urlset(rel_path, items):
+        with writer.write_stream(rel_path) as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            f.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+            for page, modified in items:
+                f.write(f"  <url><loc>{xml_escape(page_url(site_url, page))}</loc>")
+                if modified:
+                    f.write(f"<lastmod>{modified}</lastmod>")
+                f.write("</url>\n")
+            f.write('</urlset>\n')
+
+    total = len(posts) + 2
+    if total <= SITEMAP_LIMIT:
+        write_urlset('sitemap.xml', entries())
+        print(f"   生成 sitemap.xml ({total} 个 URL)")
+        return
+
+    # 分片：sitemap.xml 作为索引，记录每个分片及其中最新的 lastmod
+    shards = []
+
+    def write_shard(batch):
+        rel_path = f"sitemap-{len(shards) + 1}.xml"
+        write_urlset(rel_path, batch)
+        shards.append((rel_path, max((m for _, m in batch if m), default=None)))
+
+    batch = []
+    for item in entries():
+        batch.append(item)
+        if len(batch) == SITEMAP_LIMIT:
+            write_shard(batch)
+            batch = []
+    if batch:
+        write_shard(batch)
+
+    with writer.write_stream('sitemap.xml') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for rel_path, modified in shards:
+            f.write(f"  <sitemap><loc>{xml_escape(page_url(site_url, rel_path))}</loc>")
+            if modified:
+                f.write(f"<lastmod>{modified}</lastmod>")
+            f.write("</sitemap>\n")
+        f.write('</sitemapindex>\n')
+    print(f"   生成 sitemap.xml ({total} 个 URL，{len(shards)} 个分片)")
+
+def write_feed(writer, rel_path, title, posts, config, site_url, lastmod):
+    """逐条写出一个 Atom 订阅（posts 已按日期倒序）"""
+    limit = max(0, int(config.get('feed_entries', 20)))
+    entries = posts[:limit] if limit else posts
+    feed_url = page_url(site_url, rel_path)
+    updated = max((lastmod[post.path] for post in entries), default='1970-01-01T00:00:00Z')
+    author = xml_escape(config.get('name', ''))
+
+    with writer.write_stream(rel_path) as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        f.write('<feed xmlns="http://www.w3.org/2005/Atom">\n')
+        f.write(f"  <title>{xml_escape(title)}</title>\n")
+        f.write(f"  <id>{xml_escape(feed_url)}</id>\n")
+        f.write(f'  <link rel="self" href="{xml_attr(feed_url)}"/>\n')
+        f.write(f'  <link href="{xml_attr(page_url(site_url, "blog.html"))}"/>\n')
+        f.write(f"  <updated>{updated}</updated>\n")
+        f.write(f"  <author><name>{author}</name></author>\n")
+        for post in entries:
+            url = xml_attr(page_url(site_url, f"post/{post.slug}.html"))
+            modified = lastmod[post.path]
+            f.write("  <entry>\n")
+            f.write(f"    <title>{xml_escape(post.title)}</title>\n")
+            f.write(f"    <id>{url}</id>\n")
+            f.write(f'    <link href="{url}"/>\n')
+            f.write(f"    <published>{w3c_datetime(post.date, modified)}</published>\n")
+            f.write(f"    <updated>{modified}</updated>\n")
+            for tag in post.tags:
+                f.write(f'    <category term="{xml_attr(tag)}"/>\n')
+            if post.summary:
+                f.write(f"    <summary>{xml_escape(post.summary)}</summary>\n")
+            f.write("  </entry>\n")
+        f.write('</feed>\n')
+
+def write_feeds(writer, posts_by_category, config, site_url, lastmod):
+    """生成全站订阅 feed.xml 和各分类的 feeds/<分类>.xml"""
+    name = config.get('name', '')
+    all_posts = [post for cat_posts in posts_by_category.values() for post in cat_posts]
+    all_posts.sort(key=lambda x: (x.date, x.path), reverse=True)
+    write_feed(writer, 'feed.xml', f"{name} - Blog", all_posts, config, site_url, lastmod)
+    for category, cat_posts in sorted(posts_by_category.items()):
+        write_feed(writer, f"feeds/{category}.xml", f"{name} - {category}", cat_posts,
+                   config, site_url, lastmod)
+    print(f"   生成 feed.xml 和 {len(posts_by_category)} 个分类订阅")
+
+# ============== Service Worker ==============
+
+# 不参与预缓存的生成文件
+SW_EXCLUDE = {'sw.js', 'precache-manifest.json'}
+
+def content_hash(data):
+    """内容哈希（截取 16 位十六进制）"""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+def file_hash(path):
+    """分块计算文件内容哈希（与 content_hash 一致）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def hash_output_files(root):
+    """计算输出目录中所有文件的内容哈希，按路径排序（跳过 .git 和隐藏文件）"""
+    hashes = {}
+    for path in sorted(Path(root).rglob('*')):
+        rel_path = path.relative_to(root)
+        if any(part.startswith('.') for part in rel_path.parts) or not path.is_file():
+            continue
+        hashes[rel_path.as_posix()] = file_hash(path)
+    return hashes
+
+def build_service_worker(hashes, writer, templates_dir=None):
+    """根据生成文件的哈希输出预缓存清单和 Service Worker
+
+    hashes 会被更新为包含 sw.js 和清单文件本身的哈希
+    """
+    print("⚙️  生成 Service Worker...")
+    sw_template = Path(templates_dir or TEMPLATES_DIR) / 'sw.js'
+    if not sw_template.exists():
+        print("   跳过: templates/sw.js 不存在")
+        return
+
+    # 站点外壳和静态资源预缓存，文章页面运行时按需缓存
+    manifest = {'precache': {}, 'pages': {}}
+    for rel_path, digest in hashes.items():
+        # 站点地图和订阅只供爬虫和阅读器使用
+        if rel_path in SW_EXCLUDE or rel_path.endswith('.xml'):
+            continue
+        group = 'pages' if rel_path.startswith('post/') else 'precache'
+        manifest[group][rel_path] = digest
+
+    with open(sw_template, 'r', encoding='utf-8') as f:
+        template = f.read()
+    manifest_json = json.dumps(manifest, ensure_ascii=False, sort_keys=True)
+
+    outputs = {
+        'precache-manifest.json': json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True),
+        'sw.js': render_template(template, manifest=manifest_json)
+    }
+    for rel_path, content in outputs.items():
+        data = content.encode('utf-8')
+        writer.write(rel_path, data)
+        hashes[rel_path] = content_hash(data)
+    print(f"   预缓存 {len(manifest['precache'])} 个文件，{len(manifest['pages'])} 个文章页面")
+
+# ============== 部署清单 ==============
+
+def write_deploy_manifest(hashes, cache_dir=None):
+    """对比上次部署的文件哈希，输出新增/修改/删除的文件列表
+
+    - .cache/manifest.json  本次构建的全部文件哈希
+    - .cache/changes.json   相对上次部署 (.cache/deployed.json) 的变化
+    deploy.sh 据此只提交变化的文件，并在部署成功后把 manifest.json 复制为 deployed.json
+    """
+    print("📋 生成部署清单...")
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    deployed = {}
+    deployed_file = cache_dir / 'deployed.json'
+    if deployed_file.exists():
+        with open(deployed_file, 'r', encoding='utf-8') as f:
+            deployed = json.load(f)
+
+    changes = {
+        'added': sorted(p for p in hashes if p not in deployed),
+        'changed': sorted(p for p in hashes if p in deployed and deployed[p] != hashes[p]),
+        'deleted': sorted(p for p in deployed if p not in hashes)
+    }
+
+    cache_dir.mkdir(exist_ok=True)
+    with open(cache_dir / 'manifest.json', 'w', encoding='utf-8') as f:
+        json.dump(hashes, f, ensure_ascii=False, indent=2, sort_keys=True)
+    with open(cache_dir / 'changes.json', 'w', encoding='utf-8') as f:
+        json.dump(changes, f, ensure_ascii=False, indent=2)
+
+    print(f"   新增 {len(changes['added'])}，修改 {len(changes['changed'])}，删除 {len(changes['deleted'])}")
+    return changes
+
+# ============== 暂存目录替换 ==============
+
+def exchange_paths(a, b):
+    """原子交换两个路径（Linux renameat2 RENAME_EXCHANGE），不支持时返回 False"""
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        import ctypes
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return False
+    AT_FDCWD, RENAME_EXCHANGE = -100, 2
+    return renameat2(AT_FDCWD, os.fsencode(str(a)), AT_FDCWD, os.fsencode(str(b)), RENAME_EXCHANGE) == 0
+
+def rescue_git_dir(leftover, target):
+    """把 leftover（旧输出或暂存目录）中的 .git 移回 target，删除 leftover 前调用，移动过时返回 True
+
+    替换过程中断时，部署仓库可能还留在旧输出目录里
+    """
+    git_dir = leftover / '.git'
+    if git_dir.is_dir() and not (target / '.git').exists():
+        target.mkdir(exist_ok=True)
+        os.replace(git_dir, target / '.git')
+        return True
+    return False
+
+def swap_into_place(staging, target):
+    """用构建好的暂存目录替换输出目录
+
+    先替换目录，再把旧目录中的 .git 移到新目录；.git 始终不会进入暂存目录
+    """
+    if not target.exists():
+        os.replace(staging, target)
+        return
+
+    if exchange_paths(staging, target):
+        # 交换后 staging 中是旧的输出
+        old = staging
+    else:
+        # 不支持原子交换时退化为两次 rename，中间只有极短的窗口
+        old = target.with_name('.dist-old')
+        if old.exists():
+            rescue_git_dir(old, target)
+            shutil.rmtree(old)
+        os.replace(target, old)
+        try:
+            os.replace(staging, target)
+        except BaseException:
+            os.replace(old, target)
+            raise
+
+    rescue_git_dir(old, target)
+    shutil.rmtree(old)
+
 # ============== 清理和资源复制 ==============
 
 def clean():
-    """清理构建目录"""
+    """清理上次构建残留的暂存目录和临时文件
+
+    dist/ 本身不再删除：每次构建都写入新的暂存目录，成功后才整体替换
+    """
     print("🧹 清理构建目录...")
-    if DIST_DIR.exists():
-        git_dir = DIST_DIR / '.git'
-        git_backup = None
-        if git_dir.exists():
-            git_backup = ROOT_DIR / '.git_backup_temp'
-            shutil.move(str(git_dir), str(git_backup))
-
-        shutil.rmtree(DIST_DIR)
-
-        if git_backup and git_backup.exists():
-            DIST_DIR.mkdir()
-            shutil.move(str(git_backup), str(git_dir))
-        else:
-            DIST_DIR.mkdir()
-    else:
-        DIST_DIR.mkdir()
+    for leftover in [STAGING_DIR, ROOT_DIR / '.dist-old']:
+        if leftover.exists():
+            if rescue_git_dir(leftover, DIST_DIR):
+                print(f"   已将 {leftover.name}/.git 移回 dist/")
+            shutil.rmtree(leftover)
+            print(f"   删除: {leftover.name}/")
 
     # 清理临时文件
     for pattern in ['*.bak', '*.tmp']:
@@ -830,16 +1846,20 @@ def clean():
 
     print("   完成!")
 
-def copy_assets():
+def copy_assets(writer=None, config=None, assets_dir=None):
     """复制静态资源"""
     print("🖼️  复制静态资源...")
-    config = load_config()
+    if config is None:
+        config = load_config()
 
     # 复制背景图片
     bg = config.get('background', {}).get('image', 'background.jpg')
-    src = ROOT_DIR / bg
+    src = Path(assets_dir or ROOT_DIR) / bg
     if src.exists():
-        shutil.copy(str(src), str(DIST_DIR / bg))
+        if writer is None:
+            shutil.copy(str(src), str(DIST_DIR / bg))
+        else:
+            writer.write(bg, src.read_bytes())
         print(f"   {bg} -> dist/")
 
     print("   完成!")
@@ -904,13 +1924,618 @@ def check_dependencies():
 
     print("   完成!")
 
-def serve():
-    """启动本地预览服务器"""
+# ============== 本地预览 ==============
+
+class FileCache:
+    """小文件内存缓存（按 mtime/大小校验，超出容量时淘汰最久未用的条目）"""
+
+    def __init__(self, max_bytes=64*1024*1024):
+        self.max_bytes = max_bytes
+        self.total = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, stamp):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] != stamp:
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def put(self, key, stamp, data):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.total -= len(old[1])
+            self._items[key] = (stamp, data)
+            self.total += len(data)
+            while self.total > self.max_bytes and self._items:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self.total -= len(evicted)
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    """预览服务器请求处理
+
+    支持 ETag/Last-Modified 协商缓存 (304)、预压缩 .gz 或实时 gzip、
+    单段 Range 请求，并在内存中缓存小文件。每个请求输出一行耗时日志。
+    """
+    protocol_version = 'HTTP/1.1'
+    small_file_limit = 512 * 1024
+    cache = FileCache()
+    compressible_types = ('text/', 'application/javascript', 'application/json',
+                          'application/xml', 'image/svg+xml')
+
+    def do_GET(self):
+        self.timed(head=False)
+
+    def do_HEAD(self):
+        self.timed(head=True)
+
+    def send_response(self, code, message=None):
+        self.status = code
+        super().send_response(code, message)
+
+    def log_request(self, code='-', size='-'):
+        # 由 timed() 统一输出带耗时的日志
+        pass
+
+    def log_error(self, format, *args):
+        pass
+
+    def timed(self, head):
+        start = time.perf_counter()
+        self.status = None
+        self.sent = 0
+        try:
+            self.serve_file(head)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"   {self.status} {self.command} {self.path} {elapsed:.1f}ms {format_size(self.sent)}")
+
+    def serve_file(self, head):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            url_path = self.path.split('?', 1)[0]
+            if not url_path.endswith('/'):
+                self.send_response(301)
+                self.send_header('Location', url_path + '/')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            path = os.path.join(path, 'index.html')
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.send_error(404, 'File not found')
+            return
+
+        last_modified = formatdate(st.st_mtime, usegmt=True)
+        ctype = self.guess_type(path)
+
+        # 选择编码：优先使用预压缩文件，其次对文本类型实时压缩（Range 请求不压缩）
+        accepts_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        range_header = self.headers.get('Range')
+        encoding = None
+        source, source_st = path, st
+        if accepts_gzip and not range_header:
+            gz_path = path + '.gz'
+            gz_st = os.stat(gz_path) if os.path.isfile(gz_path) else None
+            if gz_st is not None and gz_st.st_mtime >= st.st_mtime:
+                source, source_st = gz_path, gz_st
+                encoding = 'gzip'
+            elif ctype.startswith(self.compressible_types) and 1024 < st.st_size <= self.small_file_limit:
+                encoding = 'gzip'
+
+        # 不同编码的内容使用不同的 ETag，避免条件请求拿到另一种编码的 304
+        etag = f'"{source_st.st_mtime_ns:x}-{source_st.st_size:x}{"-gz" if encoding else ""}"'
+
+        if self.not_modified(etag, st.st_mtime):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            return
+
+        # 实时压缩的结果按文件缓存；预压缩文件和未压缩文件在下面按大小读取或分块发送
+        body = None
+        if encoding and source is path:
+            stamp = (st.st_mtime_ns, st.st_size)
+            body = self.cache.get(('gzip', path), stamp)
+            if body is None:
+                body = gzip.compress(self.read_cached(path), compresslevel=6)
+                self.cache.put(('gzip', path), stamp, body)
+
+        # 解析 Range
+        start, end = 0, source_st.st_size - 1
+        if range_header and encoding is None:
+            byte_range = self.parse_range(range_header, st.st_size)
+            if byte_range is None:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{st.st_size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            start, end = byte_range
+
+        partial = (start, end) != (0, source_st.st_size - 1)
+        length = len(body) if body is not None else end - start + 1
+        self.send_response(206 if partial else 200)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(length))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if partial:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{st.st_size}')
+        self.end_headers()
+
+        if head:
+            return
+        if body is None and source_st.st_size <= self.small_file_limit:
+            body = self.read_cached(source)[start:end + 1]
+        if body is not None:
+            self.wfile.write(body)
+            self.sent = len(body)
+            return
+
+        # 大文件（包括大的预压缩文件）按块发送
+        with open(source, 'rb') as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(64 * 1024, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+                self.sent += len(chunk)
+
+    def not_modified(self, etag, mtime):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            return if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    @staticmethod
+    def parse_range(header, size):
+        """解析单段 bytes=start-end，非法或无法满足时返回 None"""
+        match = re.fullmatch(r'\s*bytes=(\d*)-(\d*)\s*', header)
+        if not match or (not match.group(1) and not match.group(2)) or size == 0:
+            return None
+        if match.group(1):
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else size - 1
+        else:
+            # bytes=-N 表示最后 N 个字节
+            start = max(size - int(match.group(2)), 0)
+            end = size - 1
+        end = min(end, size - 1)
+        if start > end:
+            return None
+        return start, end
+
+    def read_cached(self, path):
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        data = self.cache.get(path, stamp)
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+            if st.st_size <= self.small_file_limit:
+                self.cache.put(path, stamp, data)
+        return data
+
+def format_size(size):
+    """格式化文件大小"""
+    if size > 1024*1024:
+        return f"{size/1024/1024:.1f}MB"
+    elif size > 1024:
+        return f"{size/1024:.1f}KB"
+    return f"{size}B"
+
+def serve(host='0.0.0.0', port=8000):
+    """启动本地预览服务器（进程内多线程，不切换工作目录）"""
     print("\n🌐 启动本地预览服务器...")
-    print(f"   访问 http://localhost:8000 预览网站")
+    display_host = 'localhost' if host in ('', '0.0.0.0', '::') else host
+    print(f"   访问 http://{display_host}:{port} 预览网站")
     print("   按 Ctrl+C 停止服务器\n")
-    os.chdir(str(DIST_DIR))
-    subprocess.run([sys.executable, '-m', 'http.server', '8000'])
+    handler = partial(PreviewHandler, directory=str(DIST_DIR))
+    with ThreadingHTTPServer((host, port), handler) as httpd:
+        httpd.daemon_threads = True
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\n   服务器已停止")
+
+# ============== 构建调度 ==============
+
+class Task:
+    """构建任务
+
+    deps 为依赖的任务名；func 接收一个 dict（依赖任务名 -> 结果）。
+    inputs / outputs 声明任务读写的内容，用于日志和排查依赖关系。
+    """
+    __slots__ = ('name', 'func', 'deps', 'inputs', 'outputs')
+
+    def __init__(self, name, func, deps=(), inputs=(), outputs=()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+
+def run_tasks(tasks, max_workers=None):
+    """按依赖关系并发执行任务
+
+    依赖都已完成的任务立即提交到线程池，因此网络请求、Markdown 转换和资源复制可以重叠进行。
+    任务抛出异常或返回 False 视为失败，只跳过依赖它的任务，其它分支的结果照常保留。
+    返回 (results, failed, timings)，failed 为失败或被跳过的任务名 -> 原因，timings 为各任务耗时（秒）。
+    """
+    by_name = {task.name: task for task in tasks}
+    for task in tasks:
+        missing = [dep for dep in task.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"任务 {task.name} 依赖未定义的任务: {', '.join(missing)}")
+
+    results = {}
+    failed = {}
+    timings = {}
+    pending = dict(by_name)
+    running = {}
+
+    def call(task, inputs):
+        start = time.perf_counter()
+        result = task.func(inputs)
+        return result, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(tasks) or 1,
+                            thread_name_prefix='task') as executor:
+        while pending or running:
+            # 跳过依赖失败的任务
+            for name, task in list(pending.items()):
+                bad = [dep for dep in task.deps if dep in failed]
+                if bad:
+                    failed[name] = f"依赖 {', '.join(bad)} 失败"
+                    del pending[name]
+
+            # 提交所有依赖已满足的任务
+            for name, task in list(pending.items()):
+                if all(dep in results for dep in task.deps):
+                    inputs = {dep: results[dep] for dep in task.deps}
+                    running[executor.submit(call, task, inputs)] = task
+                    del pending[name]
+
+            if not running:
+                if pending:
+                    # 剩余任务互相依赖，无法继续
+                    for name in pending:
+                        failed[name] = "存在循环依赖"
+                    pending.clear()
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                try:
+                    result, elapsed = future.result()
+                except Exception as e:
+                    failed[task.name] = str(e) or type(e).__name__
+                    print(f"   ✗ {task.name} 失败: {failed[task.name]}")
+                    continue
+                if result is False:
+                    failed[task.name] = "返回失败"
+                    print(f"   ✗ {task.name} 失败")
+                else:
+                    results[task.name] = result
+                    timings[task.name] = elapsed
+                    print(f"   ✓ {task.name} ({elapsed:.2f}s)")
+
+    return results, failed, timings
+
+# ============== 构建 API ==============
+
+class BuildCache:
+    """多次构建之间保留的中间结果（常驻构建进程使用）"""
+
+    def __init__(self, hashes=None):
+        # 源文件路径 -> Post
+        self.posts = {}
+        # 文章页面路径 -> 渲染输入
+        self.page_keys = {}
+        # 输出文件路径 -> 内容哈希
+        self.hashes = {} if hashes is None else hashes
+        # 上次获取的 GitHub 信息
+        self.github = None
+
+def build_site(posts=None, config=None, output=None, posts_dir=None, templates_dir=None,
+               assets_dir=None, fetch_github=False, cache_dir=None, verbose=False,
+               previous_output=None, cache=None, build_time=None, fallback_output=None):
+    """在当前进程内构建整个网站，可供测试或其它工具直接调用
+
+    - posts: 文章来源，可以是 Post 对象或 dict（含 slug/title/date/tags/category/body 等字段）的列表；
+      未提供时扫描 posts_dir（默认 posts/）
+    - config: 配置 dict，未提供时读取 config.json
+    - output: 输出目标，目录路径（写入磁盘）或 dict 等可变映射（写入内存）；默认写入新建的 dict
+    - fetch_github: 是否请求 GitHub API，默认使用配置中的信息，不访问网络
+    - cache_dir: GitHub 快照、lastmod 索引和部署清单所在目录，为 None 时这些文件都不读写
+    - previous_output: 上次的输出目录，输出到目录时内容未变的文件从这里硬链接复用
+    - fallback_output: 主页、博客或资源任务失败时，沿用这个目录中该任务上次生成的文件，
+      其余任务照常完成；默认与 previous_output 相同
+    - build_time: 构建时间（变化文章的 lastmod；不获取 GitHub 数据时也是主页的 now），
+      未提供时由实际使用的源文件决定，见 get_build_time。GitHub 活动统计以获取时间为基准
+    - cache: BuildCache，复用上次构建解析的文章、渲染的页面和 GitHub 信息；
+      此时 fetch_github 只在缓存中还没有 GitHub 信息时生效
+
+    不会切换虚拟环境或启动子进程。返回 dict：
+    - pages: 生成的文件；内存输出为 相对路径 -> bytes，目录输出为 相对路径 -> 绝对路径
+    - stats: 文章数、写出/跳过的文件数、失败的任务、各任务耗时等
+    """
+    start = time.perf_counter()
+    if build_time is None:
+        build_time = get_build_time(posts_dir, templates_dir,
+                                    config_file=CONFIG_FILE if config is None else None, posts=posts)
+    if config is None:
+        config = load_config()
+    if output is None or isinstance(output, Mapping):
+        writer = MemoryOutput(output, verbose=verbose)
+    else:
+        Path(output).mkdir(parents=True, exist_ok=True)
+        writer = OutputWriter(output, verbose=verbose, previous=previous_output,
+                              known=cache.hashes if cache is not None else None)
+
+    def load_posts(_):
+        if posts is None:
+            return get_posts(posts_dir, cache.posts if cache is not None else None)
+        loaded = [p if isinstance(p, Post) else Post.from_dict(p) for p in posts]
+        loaded.sort(key=lambda x: (x.date, x.path), reverse=True)
+        return loaded
+
+    def load_github(_):
+        if cache is not None and cache.github is not None:
+            return cache.github
+        if fetch_github:
+            info = get_github_info(config, cache_dir=cache_dir)
+        else:
+            info = default_github_info(config)
+        if cache is not None:
+            cache.github = info
+        return info
+
+    fallbacks = {}
+    if fallback_output is None:
+        fallback_output = previous_output
+
+    def reuse_previous(name, patterns, reason):
+        """任务失败时从 fallback_output 复制该任务上次的输出，复制了文件时返回 True"""
+        if fallback_output is None:
+            return False
+        previous = Path(fallback_output)
+        reused = 0
+        for pattern in patterns:
+            if pattern.startswith('.cache/'):
+                continue
+            for source in sorted(previous.glob(pattern)):
+                rel_path = source.relative_to(previous).as_posix()
+                # 失败前已经生成的文件保留本次的版本
+                if source.is_file() and rel_path not in writer.paths:
+                    writer.write(rel_path, source.read_bytes())
+                    reused += 1
+        if reused:
+            fallbacks[name] = reason
+            print(f"   ⚠️  {name} 失败 ({reason})，沿用上次的 {reused} 个文件")
+        return reused > 0
+
+    def with_fallback(task):
+        """包装任务：失败且能沿用上次的输出时视为完成，依赖它的任务继续执行"""
+        func = task.func
+
+        def run(results):
+            try:
+                result = func(results)
+            except Exception as e:
+                if not reuse_previous(task.name, task.outputs, str(e) or type(e).__name__):
+                    raise
+                return None
+            if result is False and reuse_previous(task.name, task.outputs, "返回失败"):
+                return None
+            return result
+
+        task.func = run
+        return task
+
+    def finalize(_):
+        # 所有文件写出后才能计算内容哈希
+        print("💾 等待文件写入...")
+        writer.flush()
+        hashes = writer.hash_files()
+        build_service_worker(hashes, writer, templates_dir)
+        if cache_dir is not None:
+            write_deploy_manifest(hashes, cache_dir)
+        return hashes
+
+    background = config.get('background', {}).get('image', 'background.jpg')
+
+    # 构建任务图：GitHub 请求（网络）与文章转换、资源复制（本地）并行
+    tasks = [
+        Task('posts', load_posts,
+             inputs=['posts/']),
+        Task('github', load_github,
+             inputs=['config', 'GitHub API'], outputs=['.cache/github.json']),
+        with_fallback(Task('homepage', lambda r: build_homepage(writer, r['posts'], r['github'], config,
+                                                                templates_dir, assets_dir, build_time),
+                           deps=['posts', 'github'], inputs=['templates/index.html'], outputs=['index.html'])),
+        with_fallback(Task('blog', lambda r: build_blog(writer, r['posts'], config, templates_dir,
+                                                        cache.page_keys if cache is not None else None,
+                                                        cache_dir, build_time),
+                           deps=['posts'], inputs=['templates/blog.html', 'templates/post.html'],
+                           outputs=['blog.html', 'post/*.html', 'sitemap.xml', 'sitemap-*.xml', 'feed.xml',
+                                    'feeds/**/*.xml', '.cache/lastmod.json'])),
+        with_fallback(Task('assets', lambda _: copy_assets(writer, config, assets_dir),
+                           inputs=['background'], outputs=[background])),
+        Task('finalize', finalize,
+             deps=['homepage', 'blog', 'assets'], inputs=['dist/'],
+             outputs=['sw.js', 'precache-manifest.json', '.cache/manifest.json', '.cache/changes.json']),
+    ]
+    try:
+        results, failed, timings = run_tasks(tasks)
+    finally:
+        writer.close()
+
+    return {
+        'pages': writer.pages(),
+        'stats': {
+            'posts': len(results.get('posts', [])),
+            'written': writer.written,
+            'skipped': writer.skipped,
+            'failed': failed,
+            'fallback': fallbacks,
+            'timings': timings,
+            'elapsed': time.perf_counter() - start
+        }
+    }
+
+# ============== 常驻构建进程 ==============
+
+class BuildDaemon:
+    """常驻构建进程
+
+    在内存中保留解析好的文章、渲染过的页面、编译好的模板和 GitHub 信息，
+    每次请求只重新生成输入有变化的文件。输出直接写入 dist/（每个文件原子替换），不经过暂存目录。
+    """
+
+    def __init__(self, output=DIST_DIR, cache_dir=CACHE_DIR):
+        self.output = Path(output)
+        self.cache_dir = cache_dir
+        # 以磁盘上已有的输出为基准，内容未变的文件不重写
+        self.cache = BuildCache(hash_output_files(self.output) if self.output.exists() else {})
+
+    def rebuild(self, refresh_github=False):
+        """执行一次构建，返回 {'ok', 'log', 'stats'}，构建过程的输出收集在 log 中"""
+        if refresh_github:
+            self.cache.github = None
+        log = StringIO()
+        try:
+            with redirect_stdout(log):
+                result = build_site(output=self.output, posts_dir=POSTS_DIR, fetch_github=True,
+                                    cache_dir=self.cache_dir, cache=self.cache)
+        except Exception as e:
+            # 页面缓存可能与磁盘不一致，下次全部重新渲染
+            self.cache.page_keys.clear()
+            return {'ok': False, 'log': log.getvalue() + f"❌ 构建出错: {e}\n", 'stats': None}
+
+        stats = result['stats']
+        if stats['failed']:
+            self.cache.page_keys.clear()
+        else:
+            self.remove_stale(result['pages'])
+        print(f"   [{datetime.now():%H:%M:%S}] {'构建完成' if not stats['failed'] else '构建失败'}: "
+              f"写出 {stats['written']}，跳过 {stats['skipped']}，耗时 {stats['elapsed']*1000:.0f}ms")
+        return {'ok': not stats['failed'], 'log': log.getvalue(), 'stats': stats}
+
+    def remove_stale(self, pages):
+        """删除本次构建不再生成的文件（如已删除的文章）"""
+        for rel_path in sorted(set(self.cache.hashes) - set(pages)):
+            (self.output / rel_path).unlink(missing_ok=True)
+            del self.cache.hashes[rel_path]
+            print(f"   删除 {rel_path}")
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    """处理一个请求：读取一行 JSON，回复一行 JSON
+
+    请求格式 {"action": "build" | "ping" | "stop", "github": 是否重新获取 GitHub 数据}
+    """
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline() or b'{}')
+        except ValueError:
+            request = {}
+        action = request.get('action', 'build')
+        if action == 'build':
+            reply = self.server.builder.rebuild(refresh_github=request.get('github', False))
+        elif action == 'ping':
+            reply = {'ok': True}
+        elif action == 'stop':
+            reply = {'ok': True, 'log': "常驻构建进程已停止\n"}
+            # shutdown() 会等待 serve_forever 退出，不能在处理请求的线程中直接调用
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        else:
+            reply = {'ok': False, 'log': f"未知请求: {action}\n"}
+        self.wfile.write(json.dumps(reply, ensure_ascii=False).encode('utf-8') + b'\n')
+
+def send_daemon_request(request, timeout=None):
+    """向常驻构建进程发送请求并返回回复，进程未运行时返回 None"""
+    if not hasattr(socket, 'AF_UNIX') or not BUILD_SOCKET.exists():
+        return None
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(BUILD_SOCKET))
+        except (ConnectionRefusedError, FileNotFoundError):
+            return None
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    return json.loads(line) if line else None
+
+def run_daemon():
+    """启动常驻构建进程：先完整构建一次，然后在 BUILD_SOCKET 上等待请求"""
+    if not hasattr(socket, 'AF_UNIX'):
+        print("❌ 当前平台不支持 Unix socket，无法启动常驻构建进程")
+        return False
+    if BUILD_SOCKET.exists():
+        if send_daemon_request({'action': 'ping'}, timeout=2) is not None:
+            print("❌ 常驻构建进程已在运行")
+            return False
+        # 上次异常退出留下的 socket 文件
+        BUILD_SOCKET.unlink()
+
+    print("\n🔥 启动常驻构建进程...")
+    check_dependencies()
+    builder = BuildDaemon()
+    reply = builder.rebuild()
+    print(reply['log'], end='')
+
+    with socketserver.UnixStreamServer(str(BUILD_SOCKET), DaemonHandler) as server:
+        server.builder = builder
+        print(f"\n   监听 {BUILD_SOCKET.name}，运行 'python3 build.py --rebuild' 触发构建")
+        print("   按 Ctrl+C 停止\n")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n   常驻构建进程已停止")
+        finally:
+            BUILD_SOCKET.unlink(missing_ok=True)
+    return True
+
+def request_rebuild(refresh_github=False):
+    """请求常驻构建进程重新构建并打印结果（只依赖标准库，无需虚拟环境）"""
+    start = time.perf_counter()
+    reply = send_daemon_request({'action': 'build', 'github': refresh_github})
+    if reply is None:
+        print("❌ 常驻构建进程未运行，请先运行 'python3 build.py --daemon'")
+        return False
+    print(reply['log'], end='')
+    if reply['ok']:
+        print(f"✅ 构建完成 ({(time.perf_counter() - start)*1000:.0f}ms)")
+    else:
+        print("❌ 构建失败:")
+        for name, reason in ((reply.get('stats') or {}).get('failed') or {}).items():
+            print(f"   - {name}: {reason}")
+    return reply['ok']
 
 # ============== 主函数 ==============
 
@@ -922,21 +2547,41 @@ def build(args):
 
     if args.clean:
         clean()
-    elif not DIST_DIR.exists():
-        DIST_DIR.mkdir()
 
     check_dependencies()
 
-    # 构建主页
-    if not build_homepage():
-        print("\n❌ 主页构建失败!")
+    # 写入暂存目录，未变化的文件从当前 dist/ 硬链接复用（--clean 时全部重写）；
+    # 某个任务失败时总是沿用当前 dist/ 中的文件，--clean 也不例外
+    if STAGING_DIR.exists():
+        if rescue_git_dir(STAGING_DIR, DIST_DIR):
+            print(f"   已将 {STAGING_DIR.name}/.git 移回 dist/")
+        shutil.rmtree(STAGING_DIR)
+    fallback = DIST_DIR if DIST_DIR.exists() else None
+    previous = None if args.clean else fallback
+    try:
+        result = build_site(output=STAGING_DIR, posts_dir=POSTS_DIR, fetch_github=True,
+                            cache_dir=CACHE_DIR, verbose=args.verbose, previous_output=previous,
+                            fallback_output=fallback)
+    except BaseException:
+        shutil.rmtree(STAGING_DIR, ignore_errors=True)
+        raise
+
+    failed = result['stats']['failed']
+    if failed:
+        # 暂存目录直接丢弃，dist/ 保持上次成功构建的内容
+        shutil.rmtree(STAGING_DIR, ignore_errors=True)
+        print("\n❌ 构建失败，dist/ 保持不变:")
+        for name, reason in failed.items():
+            print(f"   - {name}: {reason}")
         return False
 
-    # 构建博客
-    build_blog()
+    swap_into_place(STAGING_DIR, DIST_DIR)
 
-    # 复制资源
-    copy_assets()
+    fallbacks = result['stats']['fallback']
+    if fallbacks:
+        print("\n⚠️  以下任务失败，沿用了上次构建的输出:")
+        for name, reason in fallbacks.items():
+            print(f"   - {name}: {reason}")
 
     # 显示结果
     print("\n" + "="*50)
@@ -944,20 +2589,11 @@ def build(args):
     print("="*50)
     print(f"\n📁 输出目录: {DIST_DIR}")
     print("\n📄 生成的文件:")
-    for f in sorted(DIST_DIR.rglob('*')):
-        if f.is_file() and '.git' not in str(f):
-            rel_path = f.relative_to(DIST_DIR)
-            size = f.stat().st_size
-            if size > 1024*1024:
-                size_str = f"{size/1024/1024:.1f}MB"
-            elif size > 1024:
-                size_str = f"{size/1024:.1f}KB"
-            else:
-                size_str = f"{size}B"
-            print(f"   {rel_path} ({size_str})")
+    for rel_path in result['pages']:
+        print(f"   {rel_path} ({format_size((DIST_DIR / rel_path).stat().st_size)})")
 
     if args.serve:
-        serve()
+        serve(args.host, args.port)
     else:
         print("\n💡 提示: 运行 'python3 build.py --serve' 可启动本地预览")
         print("💡 提示: 运行 './deploy.sh push' 可部署到 GitHub Pages")
@@ -965,23 +2601,42 @@ def build(args):
     return True
 
 def main():
-    # 确保在虚拟环境中运行
-    ensure_venv()
-
     parser = argparse.ArgumentParser(description='构建个人主页静态网站')
     parser.add_argument('--serve', '-s', action='store_true', help='构建后启动本地预览服务器')
-    parser.add_argument('--clean', '-c', action='store_true', help='构建前清理输出目录')
+    parser.add_argument('--clean', '-c', action='store_true', help='清理残留的临时文件，并完整重写所有输出文件')
     parser.add_argument('--only-serve', action='store_true', help='仅启动预览服务器')
+    parser.add_argument('--verbose', '-v', action='store_true', help='逐个输出写入的文件')
+    parser.add_argument('--host', default='0.0.0.0', help='预览服务器监听地址 (默认 0.0.0.0)')
+    parser.add_argument('--port', '-p', type=int, default=8000, help='预览服务器端口 (默认 8000)')
+    parser.add_argument('--daemon', action='store_true', help='启动常驻构建进程，通过 --rebuild 触发增量构建')
+    parser.add_argument('--rebuild', action='store_true', help='请求常驻构建进程重新构建')
+    parser.add_argument('--refresh-github', action='store_true', help='与 --rebuild 一起使用，重新获取 GitHub 数据')
+    parser.add_argument('--stop-daemon', action='store_true', help='停止常驻构建进程')
 
     args = parser.parse_args()
 
     if args.only_serve:
+        # 预览服务器只依赖标准库，无需虚拟环境
         if not DIST_DIR.exists() or not (DIST_DIR / 'index.html').exists():
             print("❌ dist/ 目录不存在，请先运行构建")
             return 1
-        serve()
+        serve(args.host, args.port)
+        return 0
+
+    # 客户端命令只与常驻进程通信，跳过虚拟环境检查
+    if args.rebuild:
+        return 0 if request_rebuild(args.refresh_github) else 1
+    if args.stop_daemon:
+        reply = send_daemon_request({'action': 'stop'}, timeout=5)
+        print(reply['log'] if reply else "常驻构建进程未运行", end='' if reply else '\n')
         return 0
 
+    # 确保在虚拟环境中运行
+    ensure_venv()
+
+    if args.daemon:
+        return 0 if run_daemon() else 1
+
     return 0 if build(args) else 1
 
 if __name__ == '__main__':
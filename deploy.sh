@@ -33,6 +33,7 @@ PROJECT_DIR="$(cd "$(dirname "$0")" && pwd)"
 DIST_DIR="$PROJECT_DIR/dist"
 CONFIG_FILE="$PROJECT_DIR/config.json"
 VENV_DIR="$PROJECT_DIR/venv"
+CACHE_DIR="$PROJECT_DIR/.cache"
 
 # 显示帮助
 show_help() {
@@ -91,14 +92,22 @@ install_deps() {
     echo -e "${YELLOW}💡 下一步: 运行 './deploy.sh build' 构建网站${NC}"
 }
 
+# 记录本次部署的文件哈希，下次构建据此计算变化
+record_deployed() {
+    if [ -f "$CACHE_DIR/manifest.json" ]; then
+        cp "$CACHE_DIR/manifest.json" "$CACHE_DIR/deployed.json"
+        rm -f "$CACHE_DIR/changes.json"
+    fi
+}
+
 # 构建网站
 build_site() {
     echo -e "${GREEN}🔨 构建静态网站...${NC}"
 
     activate_venv
 
-    # 使用统一构建脚本
-    python3 "$PROJECT_DIR/build.py" --clean
+    # 使用统一构建脚本（先写入暂存目录，成功后整体替换 dist/）
+    python3 "$PROJECT_DIR/build.py"
 
     echo ""
     echo -e "${YELLOW}💡 下一步: 运行 './deploy.sh serve' 本地预览${NC}"
@@ -119,8 +128,7 @@ serve_local() {
     echo -e "${YELLOW}按 Ctrl+C 停止服务器${NC}"
     echo ""
 
-    cd "$DIST_DIR"
-    python3 -m http.server 8000
+    python3 "$PROJECT_DIR/build.py" --only-serve --port 8000
 }
 
 # 部署到 GitHub
@@ -172,9 +180,26 @@ push_to_github() {
         git remote add origin "$GITHUB_REPO"
     fi
 
-    # 提交
-    git add -A
+    # 提交：有部署清单且已有提交历史时，只暂存构建报告的变化文件
+    CHANGES_FILE="$CACHE_DIR/changes.json"
+    if [ -f "$CHANGES_FILE" ] && git rev-parse --verify -q HEAD > /dev/null; then
+        CHANGED_COUNT=$(python3 -c "import json; c = json.load(open('$CHANGES_FILE')); print(sum(len(v) for v in c.values()))")
+        if [ "$CHANGED_COUNT" = "0" ]; then
+            echo -e "${YELLOW}⚠️  没有检测到更改，跳过部署${NC}"
+            return 0
+        fi
+        echo "   变化文件: $CHANGED_COUNT 个"
+        python3 -c "import json, sys; c = json.load(open('$CHANGES_FILE')); sys.stdout.write(''.join(p + '\0' for p in c['added'] + c['changed']))" \
+            | xargs -0 -r git add --
+        python3 -c "import json, sys; c = json.load(open('$CHANGES_FILE')); sys.stdout.write(''.join(p + '\0' for p in c['deleted']))" \
+            | xargs -0 -r git rm -q --cached --ignore-unmatch --
+    else
+        git add -A
+    fi
+
     if git diff --staged --quiet; then
+        # 清单报告了变化但 git 中已是相同内容（如首次使用部署清单），同样记录为已部署
+        record_deployed
         echo -e "${YELLOW}⚠️  没有检测到更改${NC}"
         return 0
     fi
@@ -182,6 +207,8 @@ push_to_github() {
     git commit -m "$COMMIT_MSG"
     git push -u origin main --force
 
+    record_deployed
+
     echo ""
     echo -e "${GREEN}✅ 部署成功!${NC}"
     if [ -n "$SITE_URL" ]; then
@@ -0,0 +1,128 @@
+// Service Worker - 由 build.py 生成，请勿手动修改
+// 站点外壳和静态资源预缓存，文章页面 stale-while-revalidate。
+// 缓存键带有构建时的内容哈希，内容变化时只有对应条目失效。
+const MANIFEST = {{ manifest }};
+
+const PRECACHE = 'precache-v1';
+const PAGES = 'pages-v1';
+const RUNTIME = 'runtime-v1';
+const CACHES = [PRECACHE, PAGES, RUNTIME];
+const SCOPE = self.registration.scope;
+const SCOPE_PATH = new URL(SCOPE).pathname;
+
+// 第三方 CDN 资源（Tailwind、KaTeX、字体等）
+const RUNTIME_DESTINATIONS = ['script', 'style', 'font', 'image'];
+
+function versionedKey(path, hash) {
+    return new URL(`${path}?v=${hash}`, SCOPE).href;
+}
+
+// 把请求 URL 映射到清单中的条目
+function lookup(url) {
+    const u = new URL(url);
+    if (u.origin !== self.location.origin || !u.pathname.startsWith(SCOPE_PATH)) {
+        return null;
+    }
+    let path = decodeURIComponent(u.pathname.substring(SCOPE_PATH.length));
+    if (path === '' || path.endsWith('/')) {
+        path += 'index.html';
+    }
+    if (path in MANIFEST.precache) {
+        return { cache: PRECACHE, key: versionedKey(path, MANIFEST.precache[path]) };
+    }
+    if (path in MANIFEST.pages) {
+        return { cache: PAGES, key: versionedKey(path, MANIFEST.pages[path]) };
+    }
+    return null;
+}
+
+// 缓存中的条目是否仍与清单一致
+function isCurrent(cacheName, key) {
+    const u = new URL(key);
+    const path = decodeURIComponent(u.pathname.substring(SCOPE_PATH.length));
+    const entries = cacheName === PRECACHE ? MANIFEST.precache : MANIFEST.pages;
+    return entries[path] === u.searchParams.get('v');
+}
+
+self.addEventListener('install', (event) => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(PRECACHE);
+        await Promise.all(Object.entries(MANIFEST.precache).map(async ([path, hash]) => {
+            const key = versionedKey(path, hash);
+            if (await cache.match(key)) {
+                return;  // 哈希未变，沿用已有缓存
+            }
+            const response = await fetch(new URL(path, SCOPE), { cache: 'no-cache' });
+            if (response.ok) {
+                await cache.put(key, response);
+            }
+        }));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil((async () => {
+        for (const name of await caches.keys()) {
+            if (!CACHES.includes(name)) {
+                await caches.delete(name);
+            }
+        }
+        // 只删除哈希已变化或已移除的条目
+        for (const name of [PRECACHE, PAGES]) {
+            const cache = await caches.open(name);
+            for (const request of await cache.keys()) {
+                if (!isCurrent(name, request.url)) {
+                    await cache.delete(request);
+                }
+            }
+        }
+        await self.clients.claim();
+    })());
+});
+
+async function cacheFirst(entry, request) {
+    const cache = await caches.open(entry.cache);
+    const cached = await cache.match(entry.key);
+    if (cached) {
+        return cached;
+    }
+    const response = await fetch(request);
+    if (response.ok) {
+        await cache.put(entry.key, response.clone());
+    }
+    return response;
+}
+
+async function staleWhileRevalidate(cacheName, key, request, event) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(key);
+    const network = fetch(request).then(async (response) => {
+        if (response.ok || response.type === 'opaque') {
+            await cache.put(key, response.clone());
+        }
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(network.catch(() => {}));
+        return cached;
+    }
+    return network;
+}
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    if (request.method !== 'GET' || !request.url.startsWith('http')) {
+        return;
+    }
+
+    const entry = lookup(request.url);
+    if (entry && entry.cache === PRECACHE) {
+        event.respondWith(cacheFirst(entry, request));
+    } else if (entry) {
+        event.respondWith(staleWhileRevalidate(PAGES, entry.key, request, event));
+    } else if (new URL(request.url).origin !== self.location.origin &&
+               RUNTIME_DESTINATIONS.includes(request.destination)) {
+        event.respondWith(staleWhileRevalidate(RUNTIME, request, request, event));
+    }
+});